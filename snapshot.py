@@ -0,0 +1,180 @@
+"""
+대시보드 파생 테이블의 Arrow IPC(Feather v2) 스냅샷 내보내기/읽기 모듈.
+
+Streamlit 없이도 import 할 수 있으므로, 다른 노트북이나 서비스에서 원본 CSV나
+load_data를 다시 실행하지 않고 대시보드와 같은 수치를 바로 읽을 수 있습니다.
+
+    from snapshot import load_snapshot_table
+    daily_pol = load_snapshot_table("daily_pol").to_pandas()
+
+파일은 압축 없이 저장되므로 메모리 매핑(memory-map)으로 복사 없이 읽힙니다.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import pyarrow as pa
+
+SNAPSHOT_DIR = "snapshots"
+MANIFEST_NAME = "manifest.json"
+LATEST_NAME = "LATEST"
+FORMAT_VERSION = 1
+
+
+def fingerprint_sources(paths):
+    """원본 파일별 SHA-256, 크기, 수정 시각을 반환합니다. 없는 파일은 None으로 기록합니다."""
+    fingerprints = {}
+    for path in paths:
+        if not os.path.exists(path):
+            fingerprints[os.path.basename(path)] = None
+            continue
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        stat = os.stat(path)
+        fingerprints[os.path.basename(path)] = {
+            "sha256": digest.hexdigest(),
+            "size": stat.st_size,
+            "mtime": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+        }
+    return fingerprints
+
+
+def _serialize_table(df):
+    """DataFrame을 압축 없는 Arrow IPC 파일 형식(Feather v2)의 바이트로 직렬화합니다."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return table, sink.getvalue()
+
+
+def snapshot_version(fingerprints, table_digests):
+    """
+    원본 지문과 파생 테이블 내용(스키마 포함)의 해시로 결정적인 스냅샷 버전 문자열을 만듭니다.
+    원본이 같아도 파생 테이블의 계산 방식이나 열 구성이 바뀌면 버전이 달라집니다.
+    """
+    content = {
+        name: (fp["sha256"] if fp else None) for name, fp in fingerprints.items()
+    }
+    payload = json.dumps(
+        {"format": FORMAT_VERSION, "sources": content, "tables": table_digests},
+        sort_keys=True,
+    ).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:12]
+
+
+def export_snapshot(tables, source_fingerprints, base_dir=SNAPSHOT_DIR):
+    """
+    파생 테이블(dict[str, DataFrame])을 버전별 디렉터리에 Feather 파일과 manifest로 저장합니다.
+    source_fingerprints는 테이블을 만들 때 읽은 원본의 지문(fingerprint_sources 결과)입니다.
+    같은 버전의 스냅샷이 이미 있으면 다시 쓰지 않습니다.
+    반환값: (버전, 스냅샷 디렉터리 경로)
+    """
+    serialized = {name: _serialize_table(df) for name, df in tables.items()}
+    table_digests = {
+        name: hashlib.sha256(buffer).hexdigest()
+        for name, (_, buffer) in serialized.items()
+    }
+    version = snapshot_version(source_fingerprints, table_digests)
+    version_dir = os.path.join(base_dir, version)
+
+    if os.path.exists(os.path.join(version_dir, MANIFEST_NAME)):
+        _write_latest(base_dir, version)
+        return version, version_dir
+
+    # 임시 디렉터리에 모두 쓴 뒤 한 번에 교체하여, 읽는 쪽이 불완전한 스냅샷을 보지 않게 합니다.
+    tmp_dir = f"{version_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    table_entries = {}
+    for name, (table, buffer) in serialized.items():
+        file_name = f"{name}.arrow"
+        with open(os.path.join(tmp_dir, file_name), "wb") as f:
+            f.write(buffer)
+        table_entries[name] = {
+            "file": file_name,
+            "rows": table.num_rows,
+            "columns": table.schema.names,
+            "schema": [str(field.type) for field in table.schema],
+            "sha256": table_digests[name],
+        }
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sources": source_fingerprints,
+        "tables": table_entries,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(tmp_dir, version_dir)
+    _write_latest(base_dir, version)
+    return version, version_dir
+
+
+def _write_latest(base_dir, version):
+    tmp_path = os.path.join(base_dir, f"{LATEST_NAME}.tmp-{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(base_dir, LATEST_NAME))
+
+
+def list_snapshot_versions(base_dir=SNAPSHOT_DIR):
+    """manifest가 있는 스냅샷 버전 목록을 생성 시각 순으로 반환합니다."""
+    if not os.path.isdir(base_dir):
+        return []
+
+    manifests = []
+    for version in os.listdir(base_dir):
+        path = os.path.join(base_dir, version, MANIFEST_NAME)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                manifests.append(json.load(f))
+    return [m["version"] for m in sorted(manifests, key=lambda m: m["created_at"])]
+
+
+def load_manifest(version=None, base_dir=SNAPSHOT_DIR):
+    """스냅샷 manifest를 읽습니다. version이 없으면 가장 최근 스냅샷을 사용합니다."""
+    if version is None:
+        latest_path = os.path.join(base_dir, LATEST_NAME)
+        if not os.path.exists(latest_path):
+            raise FileNotFoundError(f"'{base_dir}'에 내보낸 스냅샷이 없습니다.")
+        with open(latest_path, encoding="utf-8") as f:
+            version = f.read().strip()
+
+    with open(os.path.join(base_dir, version, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_snapshot_table(name, version=None, base_dir=SNAPSHOT_DIR):
+    """스냅샷 테이블 하나를 메모리 매핑으로 복사 없이 읽어 pyarrow.Table로 반환합니다."""
+    manifest = load_manifest(version, base_dir)
+    if name not in manifest["tables"]:
+        raise KeyError(
+            f"스냅샷 {manifest['version']}에 '{name}' 테이블이 없습니다. "
+            f"사용 가능한 테이블: {', '.join(manifest['tables'])}"
+        )
+
+    path = os.path.join(base_dir, manifest["version"], manifest["tables"][name]["file"])
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def load_snapshot(version=None, base_dir=SNAPSHOT_DIR):
+    """스냅샷의 모든 테이블을 dict[str, pyarrow.Table]로 반환합니다."""
+    manifest = load_manifest(version, base_dir)
+    return {
+        name: load_snapshot_table(name, manifest["version"], base_dir)
+        for name in manifest["tables"]
+    }
@@ -4,9 +4,15 @@ import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 import pydeck as pdk
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import os
+import hashlib
+import threading
 import itertools  # for combining population data
 
+from snapshot import export_snapshot, fingerprint_sources
+
 # -------------------------------------------------------------
 # 기본 설정
 # -------------------------------------------------------------
@@ -41,25 +47,1096 @@ def get_pm10_status(pm10):
     else:
         return "매우 나쁨(151+)", [255, 118, 117]
 
+# -------------------------------------------------------------
+# PM10 기준값 민감도 분석 함수
+# -------------------------------------------------------------
+PM10_THRESHOLD_PRESETS = {
+    "국내 기준 (30/80/150)": [30, 80, 150],
+    "WHO 권고기준 (45)": [45],
+    "WHO 잠정목표 (50/75/100/150)": [50, 75, 100, 150],
+}
+
+
+def _cumulative_by_pm10(pm10, values):
+    """PM10 기준으로 한 번 정렬한 뒤, 정렬된 PM10과 값의 누적합을 반환합니다."""
+    pm10 = np.asarray(pm10, dtype="float64")
+    values = np.asarray(values, dtype="float64")
+    valid = ~(np.isnan(pm10) | np.isnan(values))
+    order = np.argsort(pm10[valid], kind="stable")
+    sorted_pm10 = pm10[valid][order]
+    cumsum = np.concatenate([[0.0], np.cumsum(values[valid][order])])
+    return sorted_pm10, cumsum
+
+
+@st.cache_data
+def sweep_pm10_thresholds(pm10, values, thresholds):
+    """
+    후보 기준값 전체에 대해 'PM10 ≤ 기준값' / '기준값 초과' 구간의 건수와 평균을 한 번에 계산합니다.
+    기준값마다 groupby를 반복하지 않고 searchsorted와 누적합으로 처리합니다.
+    """
+    sorted_pm10, cumsum = _cumulative_by_pm10(pm10, values)
+    thresholds = np.asarray(thresholds, dtype="float64")
+    total = len(sorted_pm10)
+
+    idx = np.searchsorted(sorted_pm10, thresholds, side="right")
+    below_sum = cumsum[idx]
+    above_sum = cumsum[-1] - below_sum
+    below_cnt = idx
+    above_cnt = total - idx
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        below_mean = np.where(below_cnt > 0, below_sum / below_cnt, np.nan)
+        above_mean = np.where(above_cnt > 0, above_sum / above_cnt, np.nan)
+
+    return pd.DataFrame(
+        {
+            "이하_건수": below_cnt,
+            "이하_평균": below_mean,
+            "초과_건수": above_cnt,
+            "초과_평균": above_mean,
+            "평균_차이": above_mean - below_mean,
+        },
+        index=pd.Index(thresholds, name="기준값"),
+    )
+
+
+@st.cache_data
+def pm10_bucket_stats(pm10, values, cutoffs):
+    """주어진 기준값(cutoffs)으로 나눈 PM10 구간별 건수와 평균을 계산합니다."""
+    sorted_pm10, cumsum = _cumulative_by_pm10(pm10, values)
+    cutoffs = np.sort(np.asarray(cutoffs, dtype="float64"))
+
+    edges = np.concatenate(
+        [[0], np.searchsorted(sorted_pm10, cutoffs, side="right"), [len(sorted_pm10)]]
+    )
+    counts = np.diff(edges)
+    sums = np.diff(cumsum[edges])
+
+    bounds = ["0"] + [f"{c:g}" for c in cutoffs]
+    labels = [f"{lo}~{hi}" for lo, hi in zip(bounds[:-1], bounds[1:])]
+    labels.append(f"{cutoffs[-1]:g}+")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    return pd.DataFrame({"구간": labels, "건수": counts, "평균": means})
+
+# -------------------------------------------------------------
+# 분위수 스케치 함수
+# -------------------------------------------------------------
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_QUANTILES = [0.5, 0.9, 0.95]
+
+
+def build_quantile_sketches(df, value_col, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+    """
+    (자치구, 연도) 파티션별 로그 버킷 분위수 스케치(DDSketch 방식)를 한 번에 생성합니다.
+    모든 파티션이 같은 버킷 경계를 공유하므로 버킷 개수를 더하는 것만으로 병합됩니다.
+    """
+    empty = {
+        "keys": pd.DataFrame(columns=["자치구", "Year"]),
+        "counts": np.zeros((0, 1), dtype="int64"),
+        "gamma": 1.0,
+        "min_index": 0,
+    }
+    if df.empty or value_col not in df.columns:
+        return empty
+
+    values = pd.to_numeric(df[value_col], errors="coerce").to_numpy(dtype="float64")
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return empty
+
+    parts = df.loc[valid, ["자치구", "Year"]].astype(str)
+    values = values[valid]
+    part_codes, part_keys = pd.MultiIndex.from_frame(parts).factorize()
+
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+    positive = values > 0
+    log_index = np.zeros(len(values), dtype="int64")
+    log_index[positive] = np.ceil(np.log(values[positive]) / np.log(gamma)).astype("int64")
+    min_index = int(log_index[positive].min()) if positive.any() else 0
+    max_index = int(log_index[positive].max()) if positive.any() else 0
+
+    # 버킷 0은 0 이하 값, 1부터는 로그 버킷
+    buckets = np.where(positive, log_index - min_index + 1, 0)
+    n_buckets = max_index - min_index + 2
+
+    counts = np.zeros((len(part_keys), n_buckets), dtype="int64")
+    np.add.at(counts, (part_codes, buckets), 1)
+
+    return {
+        "keys": part_keys.to_frame(index=False, name=["자치구", "Year"]),
+        "counts": counts,
+        "gamma": gamma,
+        "min_index": min_index,
+    }
+
+
+def query_sketch_quantiles(sketch, gus, years, quantiles=SKETCH_QUANTILES, by=None):
+    """
+    선택한 자치구·연도 파티션의 스케치를 병합하여 분위수를 반환합니다.
+    by에 "자치구" 또는 "Year"를 지정하면 해당 기준으로 그룹별 분위수를 계산합니다.
+    """
+    keys = sketch["keys"]
+    columns = [f"P{int(q * 100)}" for q in quantiles]
+    if keys.empty:
+        return pd.DataFrame(columns=columns)
+
+    mask = (keys["자치구"].isin(gus) & keys["Year"].isin(years)).to_numpy()
+    if not mask.any():
+        return pd.DataFrame(columns=columns)
+
+    selected = pd.DataFrame(sketch["counts"][mask])
+    if by is None:
+        merged = selected.sum(axis=0).to_frame().T
+        merged.index = ["전체"]
+    else:
+        merged = selected.groupby(keys.loc[mask, by].to_numpy()).sum()
+
+    counts = merged.to_numpy()
+    cdf = np.cumsum(counts, axis=1)
+    totals = cdf[:, -1:]
+    ranks = np.asarray(quantiles)[None, :] * (totals - 1)
+
+    # 각 그룹·분위수에 대해 누적 개수가 순위를 처음 넘는 버킷을 찾습니다.
+    bucket_idx = (cdf[:, None, :] > ranks[:, :, None]).argmax(axis=2)
+
+    gamma = sketch["gamma"]
+    log_index = bucket_idx + sketch["min_index"] - 1
+    estimates = np.where(
+        bucket_idx == 0, 0.0, 2 * np.power(gamma, log_index) / (gamma + 1)
+    )
+    return pd.DataFrame(estimates, index=merged.index, columns=columns)
+
+# -------------------------------------------------------------
+# PM10 예측 함수
+# -------------------------------------------------------------
+FORECAST_HORIZON = 7
+FORECAST_AR_LAGS = 7
+FORECAST_RIDGE = 1e-3
+
+
+def build_daily_matrix(daily_df, value_col="미세먼지(PM10)"):
+    """일별 자치구 데이터를 날짜 × 자치구 행렬로 변환합니다. 누락된 날짜는 NaN으로 채워집니다."""
+    if daily_df.empty:
+        return pd.DataFrame()
+
+    matrix = daily_df[daily_df["자치구"] != "평균"].pivot_table(
+        index="Date", columns="자치구", values=value_col, aggfunc="mean"
+    )
+    full_range = pd.date_range(matrix.index.min(), matrix.index.max(), freq="D")
+    return matrix.reindex(full_range).rename_axis("Date")
+
+
+def _seasonal_features(dates):
+    """연간 계절성을 표현하는 sin/cos 특성 (T, 2)을 반환합니다."""
+    angle = 2 * np.pi * pd.DatetimeIndex(dates).dayofyear.to_numpy() / 365.25
+    return np.column_stack([np.sin(angle), np.cos(angle)])
+
+
+def _forecast_design(log_values, dates, history):
+    """
+    모든 자치구에 대한 계절 AR 설계 행렬을 한 번에 만듭니다.
+    log_values: (T, D), history: 직전 FORECAST_AR_LAGS일의 값 (p, D)
+    반환값: X (D, T, k), y (D, T), 유효 가중치 w (D, T)
+    """
+    n_days, n_gus = log_values.shape
+    extended = np.vstack([history, log_values])
+
+    lags = np.stack(
+        [
+            extended[FORECAST_AR_LAGS - i : FORECAST_AR_LAGS - i + n_days]
+            for i in range(1, FORECAST_AR_LAGS + 1)
+        ],
+        axis=-1,
+    )  # (T, D, p)
+    season = np.broadcast_to(
+        _seasonal_features(dates)[:, None, :], (n_days, n_gus, 2)
+    )
+    ones = np.ones((n_days, n_gus, 1))
+    X = np.concatenate([ones, lags, season], axis=-1).transpose(1, 0, 2)
+    y = log_values.T
+
+    w = (np.isfinite(X).all(axis=-1) & np.isfinite(y)).astype("float64")
+    return np.nan_to_num(X), np.nan_to_num(y), w
+
+
+def _empty_forecast_state(gus):
+    n_features = 1 + FORECAST_AR_LAGS + 2
+    return {
+        "gus": list(gus),
+        "last_date": None,
+        "history": np.full((FORECAST_AR_LAGS, len(gus)), np.nan),
+        "xtx": np.zeros((len(gus), n_features, n_features)),
+        "xty": np.zeros((len(gus), n_features)),
+        "params": np.zeros((len(gus), n_features)),
+    }
+
+
+def update_pm10_forecast_model(state, new_block):
+    """
+    새로 들어온 날짜 구간(new_block: 날짜 × 자치구)만으로 정규방정식 통계량을 갱신하고
+    모든 자치구의 계수를 배치 선형대수로 다시 풉니다.
+    """
+    if new_block.empty:
+        return state
+
+    log_values = np.log1p(new_block[state["gus"]].to_numpy(dtype="float64"))
+    X, y, w = _forecast_design(log_values, new_block.index, state["history"])
+
+    xtx = state["xtx"] + np.einsum("dtk,dt,dtl->dkl", X, w, X)
+    xty = state["xty"] + np.einsum("dtk,dt,dt->dk", X, w, y)
+    ridge = FORECAST_RIDGE * np.eye(xtx.shape[-1])
+    params = np.linalg.solve(xtx + ridge, xty[..., None])[..., 0]
+
+    history = np.vstack([state["history"], log_values])[-FORECAST_AR_LAGS:]
+    return {
+        "gus": state["gus"],
+        "last_date": new_block.index.max(),
+        "history": history,
+        "xtx": xtx,
+        "xty": xty,
+        "params": params,
+    }
+
+
+@st.cache_resource
+def _forecast_model_store():
+    """세션 간에 공유되는 예측 모델 상태 저장소입니다. 여러 세션이 동시에 접근하므로 잠금을 함께 둡니다."""
+    return {"lock": threading.Lock(), "models": {}}
+
+
+def _matrix_fingerprint(matrix):
+    """날짜 × 자치구 행렬의 자치구 구성, 날짜, 값을 모두 반영한 지문을 만듭니다."""
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(map(str, matrix.columns)).encode("utf-8"))
+    digest.update(matrix.index.asi8.tobytes())
+    digest.update(np.ascontiguousarray(matrix.to_numpy(dtype="float64")).tobytes())
+    return digest.hexdigest()
+
+
+def get_pm10_forecast_model(pm10_matrix, model_key="raw"):
+    """
+    캐시된 예측 모델을 반환합니다. model_key별(예: 결측 보정 방식)로 모델을 따로 보관합니다.
+    이미 학습한 구간이 그대로이고 새 날짜만 추가된 경우에만 추가 구간으로 증분 재학습하고,
+    이전 구간의 값이 바뀌었으면 처음부터 다시 학습합니다.
+    """
+    store = _forecast_model_store()
+    gus = list(pm10_matrix.columns)
+
+    with store["lock"]:
+        state = store["models"].get(model_key)
+        reusable = (
+            state is not None
+            and state["gus"] == gus
+            and state["last_date"] is not None
+            and state["last_date"] <= pm10_matrix.index.max()
+            and _matrix_fingerprint(pm10_matrix[pm10_matrix.index <= state["last_date"]])
+            == state["fingerprint"]
+        )
+
+        if not reusable:
+            state = update_pm10_forecast_model(_empty_forecast_state(gus), pm10_matrix)
+        elif pm10_matrix.index.max() > state["last_date"]:
+            state = update_pm10_forecast_model(
+                state, pm10_matrix[pm10_matrix.index > state["last_date"]]
+            )
+        else:
+            return state
+
+        state["fingerprint"] = _matrix_fingerprint(pm10_matrix)
+        store["models"][model_key] = state
+        return state
+
+
+def forecast_pm10(state, horizon=FORECAST_HORIZON):
+    """모든 자치구의 향후 horizon일 PM10을 재귀적으로 예측합니다 (날짜 × 자치구)."""
+    window = pd.DataFrame(state["history"]).ffill().bfill().to_numpy()
+    dates = pd.date_range(
+        state["last_date"] + pd.Timedelta(days=1), periods=horizon, freq="D"
+    )
+    season = _seasonal_features(dates)
+    n_gus = window.shape[1]
+
+    predictions = []
+    for step in range(horizon):
+        features = np.column_stack(
+            [
+                np.ones(n_gus),
+                window[::-1].T,
+                np.broadcast_to(season[step], (n_gus, 2)),
+            ]
+        )
+        pred = np.einsum("dk,dk->d", features, state["params"])
+        predictions.append(pred)
+        window = np.vstack([window[1:], pred])
+
+    forecast = np.clip(np.expm1(np.array(predictions)), 0, None)
+    return pd.DataFrame(forecast, index=dates, columns=state["gus"]).rename_axis("Date")
+
+# -------------------------------------------------------------
+# 상관계수 신뢰구간 함수
+# -------------------------------------------------------------
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_CI = 0.95
+BOOTSTRAP_MIN_SAMPLES = 5  # 이보다 관측치가 적으면 신뢰구간/p-value가 의미가 없어 표시하지 않습니다.
+
+
+def _batched_pearson(samples):
+    """(B, n, m) 배열의 각 표본에 대한 Pearson 상관행렬 (B, m, m)을 계산합니다."""
+    centered = samples - samples.mean(axis=1, keepdims=True)
+    norms = np.sqrt((centered**2).sum(axis=1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized = centered / norms[:, None, :]
+    return np.einsum("bni,bnj->bij", normalized, normalized)
+
+
+@st.cache_data
+def correlation_confidence(data, n_resamples=BOOTSTRAP_RESAMPLES, ci=BOOTSTRAP_CI, seed=0):
+    """
+    모든 지표 쌍에 대한 부트스트랩 신뢰구간과 순열검정 p-value를 한 번의 배치 연산으로 계산합니다.
+    data: 행이 관측치(자치구), 열이 지표인 DataFrame
+    """
+    columns = list(data.columns)
+    values = data.to_numpy(dtype="float64")
+    n_obs = len(values)
+    rng = np.random.default_rng(seed)
+
+    observed = _batched_pearson(values[None])[0]
+
+    boot_idx = rng.integers(0, n_obs, size=(n_resamples, n_obs))
+    boot_corr = _batched_pearson(values[boot_idx])
+    alpha = (1 - ci) / 2
+    lower, upper = np.nanquantile(boot_corr, [alpha, 1 - alpha], axis=0)
+
+    # 각 열을 독립적으로 섞어 귀무가설(상관 없음) 하의 분포를 만듭니다.
+    permuted = rng.permuted(
+        np.broadcast_to(values, (n_resamples, n_obs, values.shape[1])), axis=1
+    )
+    perm_corr = _batched_pearson(permuted)
+    exceed = (np.abs(perm_corr) >= np.abs(observed) - 1e-12).sum(axis=0)
+    p_value = (exceed + 1) / (n_resamples + 1)
+
+    def to_frame(arr):
+        return pd.DataFrame(arr, index=columns, columns=columns)
+
+    return {
+        "corr": to_frame(observed),
+        "lower": to_frame(lower),
+        "upper": to_frame(upper),
+        "p_value": to_frame(p_value),
+    }
+
+
+def correlation_summary(confidence):
+    """상관행렬의 상삼각 쌍별로 상관계수, 신뢰구간, p-value를 정리합니다."""
+    columns = list(confidence["corr"].columns)
+    rows = []
+    for i, j in itertools.combinations(range(len(columns)), 2):
+        rows.append(
+            {
+                "지표 1": columns[i],
+                "지표 2": columns[j],
+                "상관계수": confidence["corr"].iat[i, j],
+                f"{BOOTSTRAP_CI:.0%} CI 하한": confidence["lower"].iat[i, j],
+                f"{BOOTSTRAP_CI:.0%} CI 상한": confidence["upper"].iat[i, j],
+                "p-value": confidence["p_value"].iat[i, j],
+            }
+        )
+    return pd.DataFrame(rows)
+
+# -------------------------------------------------------------
+# 자치구 간 PM10 유사도 함수
+# -------------------------------------------------------------
+SIMILAR_GU_COUNT = 5
+
+
+def _cluster_order(distance):
+    """평균 연결(average linkage) 계층적 군집의 잎(leaf) 순서를 반환합니다."""
+    d = np.nan_to_num(np.asarray(distance, dtype="float64"), nan=np.nanmax(distance))
+    np.fill_diagonal(d, np.inf)
+    clusters = {i: [i] for i in range(len(d))}
+
+    while len(clusters) > 1:
+        keys = list(clusters)
+        sub = d[np.ix_(keys, keys)]
+        a, b = np.unravel_index(np.argmin(sub), sub.shape)
+        ka, kb = keys[a], keys[b]
+        na, nb = len(clusters[ka]), len(clusters[kb])
+
+        d[ka, :] = (na * d[ka, :] + nb * d[kb, :]) / (na + nb)
+        d[:, ka] = d[ka, :]
+        d[ka, ka] = np.inf
+        clusters[ka] = clusters[ka] + clusters.pop(kb)
+
+    return next(iter(clusters.values()))
+
+
+@st.cache_data
+def district_similarity(pm10_matrix, years):
+    """
+    선택 연도의 자치구별 일별 PM10 시계열로 25 × 25 상관행렬과 RMS 거리행렬을 한 번에 계산합니다.
+    결측일은 쌍별로 제외(pairwise complete)하며, 행렬곱으로 모든 쌍을 동시에 처리합니다.
+    """
+    sub = pm10_matrix[pm10_matrix.index.year.astype(str).isin(years)]
+    gus = list(sub.columns)
+    values = sub.to_numpy(dtype="float64")
+    valid = np.isfinite(values).astype("float64")
+    x = np.nan_to_num(values)
+
+    n = valid.T @ valid
+    sum_x = x.T @ valid
+    sum_xx = (x**2).T @ valid
+    sum_xy = x.T @ x
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var = sum_xx - sum_x**2 / n
+        corr = cov / np.sqrt(var * var.T)
+        distance = np.sqrt(np.clip(sum_xx + sum_xx.T - 2 * sum_xy, 0, None) / n)
+
+    order = _cluster_order(1 - corr)
+
+    ranked = np.where(np.eye(len(gus), dtype=bool), -np.inf, np.nan_to_num(corr, nan=-np.inf))
+    neighbours = np.argsort(-ranked, axis=1)[:, :SIMILAR_GU_COUNT]
+
+    return {
+        "corr": pd.DataFrame(corr, index=gus, columns=gus),
+        "distance": pd.DataFrame(distance, index=gus, columns=gus),
+        "order": [gus[i] for i in order],
+        "neighbours": {gu: [gus[j] for j in neighbours[i]] for i, gu in enumerate(gus)},
+    }
+
+
+def most_similar_districts(similarity, gu):
+    """캐시된 유사도 결과에서 PM10 변동이 가장 비슷한 자치구 목록을 반환합니다."""
+    neighbours = similarity["neighbours"].get(gu, [])
+    return pd.DataFrame(
+        {
+            "자치구": neighbours,
+            "상관계수": [similarity["corr"].at[gu, g] for g in neighbours],
+            "RMS 차이 (μg/m³)": [similarity["distance"].at[gu, g] for g in neighbours],
+        }
+    )
+
+# -------------------------------------------------------------
+# 파생 데이터셋 의존성 그래프
+# -------------------------------------------------------------
+DATASET_GRAPH = {}
+
+
+def dataset_node(name, *deps):
+    """함수를 파생 데이터셋 노드로 등록합니다. deps는 입력 또는 다른 노드의 이름입니다."""
+
+    def register(fn):
+        DATASET_GRAPH[name] = (deps, fn)
+        return fn
+
+    return register
+
+
+def resolve_dataset(name, inputs, memo):
+    """
+    노드의 (값, 버전)을 반환합니다.
+    입력 버전이 바뀐 노드와 그 하위 노드만 다시 계산하고, 나머지는 memo에 저장된 결과를 재사용합니다.
+    """
+    if name in inputs:
+        return inputs[name]
+
+    deps, fn = DATASET_GRAPH[name]
+    resolved = [resolve_dataset(dep, inputs, memo) for dep in deps]
+    version = (name,) + tuple(dep_version for _, dep_version in resolved)
+
+    cached = memo.get(name)
+    if cached is None or cached[1] != version:
+        memo[name] = (fn(*[value for value, _ in resolved]), version)
+    return memo[name]
+
+
+@dataset_node("view_gus", "gus", "focus_gu")
+def select_view_gus(gus, focus_gu):
+    """지도에서 자치구를 선택하면 다른 화면은 해당 자치구만 보도록 교차 필터링합니다."""
+    return [focus_gu] if focus_gu in gus else list(gus)
+
+
+@dataset_node("pol_filt", "pol", "years", "view_gus")
+def filter_pol(pol, years, gus):
+    return pol[(pol["Year"].isin(years)) & (pol["자치구"].isin(gus))]
+
+
+@dataset_node("trans_filt", "trans", "years", "view_gus")
+def filter_trans(trans, years, gus):
+    if trans.empty:
+        return trans
+    return trans[(trans["Year"].isin(years)) & (trans["자치구"].isin(gus))]
+
+
+@dataset_node("spent_filt", "spent", "years", "view_gus")
+def filter_spent(spent, years, gus):
+    if spent.empty:
+        return spent
+    return spent[(spent["Year"].isin(years)) & (spent["자치구"].isin(gus))]
+
+
+@dataset_node("pm10_imputation", "pm10_matrix", "imputation")
+def impute_pm10_matrix(pm10_matrix, method):
+    if pm10_matrix.empty:
+        return pm10_matrix, pm10_matrix
+    return impute_matrix(pm10_matrix, method)
+
+
+@dataset_node("transit_imputation", "transit_matrix", "imputation")
+def impute_transit_matrix(transit_matrix, method):
+    if transit_matrix.empty:
+        return transit_matrix, transit_matrix
+    return impute_matrix(transit_matrix, method)
+
+
+@dataset_node("pm10_imputed", "pm10_imputation")
+def select_pm10_imputed(pm10_imputation):
+    return pm10_imputation[0]
+
+
+@dataset_node("transit_imputed", "transit_imputation")
+def select_transit_imputed(transit_imputation):
+    return transit_imputation[0]
+
+
+@dataset_node(
+    "mobility_source", "combined_mobility", "pm10_imputed", "transit_imputed", "imputation"
+)
+def build_mobility_source(combined_mobility, pm10_imputed, transit_imputed, method):
+    """결측 보정을 선택하면 보정된 PM10·승객 수 행렬로 자치구별 일별 통합 데이터를 다시 만듭니다."""
+    if method == IMPUTATION_METHODS[0] or pm10_imputed.empty or transit_imputed.empty:
+        return combined_mobility
+
+    mobility = pd.merge(
+        pm10_imputed.stack().dropna().rename("미세먼지(PM10)").reset_index(),
+        transit_imputed.stack().dropna().rename("승객_수").reset_index(),
+        on=["Date", "자치구"],
+        how="inner",
+    )
+    mobility["Status"], mobility["Color"] = zip(
+        *mobility["미세먼지(PM10)"].apply(get_pm10_status)
+    )
+    return mobility
+
+
+@dataset_node("delivery_source", "combined_delivery", "delivery", "pm10_imputed", "imputation")
+def build_delivery_source(combined_delivery, delivery, pm10_imputed, method):
+    """결측 보정을 선택하면 보정된 자치구 행렬의 서울 평균 PM10을 배달 데이터와 결합합니다."""
+    if method == IMPUTATION_METHODS[0] or pm10_imputed.empty or delivery.empty:
+        return combined_delivery
+
+    seoul_daily_pol = pm10_imputed.mean(axis=1).rename("미세먼지(PM10)").reset_index()
+    return pd.merge(seoul_daily_pol, delivery, on="Date", how="inner")
+
+
+@dataset_node("mobility_filt", "mobility_source", "years", "view_gus")
+def filter_mobility(combined_mobility, years, gus):
+    if combined_mobility.empty:
+        return pd.DataFrame()
+    return combined_mobility[
+        (combined_mobility["Date"].dt.year.astype(str).isin(years))
+        & (combined_mobility["자치구"].isin(gus))
+    ].copy()
+
+
+@dataset_node("daily_comp_mobility", "mobility_filt")
+def aggregate_daily_mobility(mobility_filt):
+    if mobility_filt.empty:
+        return pd.DataFrame()
+    return (
+        mobility_filt.groupby("Date")
+        .agg({"미세먼지(PM10)": "mean", "승객_수": "sum"})
+        .reset_index()
+    )
+
+
+def _select_years_gus(matrix, years, gus):
+    if matrix.empty:
+        return matrix
+    return matrix.loc[
+        matrix.index.year.astype(str).isin(years),
+        [g for g in gus if g in matrix.columns],
+    ]
+
+
+@dataset_node("daily_pm10_trend", "pol_filt", "pm10_imputed", "years", "view_gus", "imputation")
+def aggregate_daily_pm10_trend(pol_filt, pm10_imputed, years, gus, method):
+    if method != IMPUTATION_METHODS[0] and not pm10_imputed.empty:
+        return _select_years_gus(pm10_imputed, years, gus)
+    return pol_filt.groupby(["Date", "자치구"])["미세먼지(PM10)"].mean().unstack()
+
+
+@dataset_node("avg_pm10", "pol_filt")
+def aggregate_avg_pm10(pol_filt):
+    return (
+        pol_filt.groupby("자치구")["미세먼지(PM10)"]
+        .mean()
+        .sort_values(ascending=False)
+    )
+
+
+@dataset_node("pm10_components", "pm10_matrix")
+def decompose_pm10_matrix(pm10_matrix):
+    """잔차 화면을 요청할 때만 계산되도록 시계열 분해를 노드로 둡니다."""
+    return decompose_seasonal_trend(pm10_matrix)
+
+
+@dataset_node("transit_components", "transit_matrix")
+def decompose_transit_matrix(transit_matrix):
+    return decompose_seasonal_trend(transit_matrix)
+
+
+@dataset_node("residual_pm10_trend", "pm10_components", "years", "view_gus")
+def select_residual_pm10_trend(pm10_components, years, gus):
+    return _select_years_gus(pm10_components["residual"], years, gus)
+
+
+@dataset_node(
+    "residual_daily_mobility", "pm10_components", "transit_components", "years", "view_gus"
+)
+def aggregate_residual_daily_mobility(pm10_components, transit_components, years, gus):
+    """daily_comp_mobility와 같은 방식(PM10 평균, 승객 수 합계)으로 잔차를 일별 집계합니다."""
+    pm10 = _select_years_gus(pm10_components["residual"], years, gus)
+    transit = _select_years_gus(transit_components["residual"], years, gus)
+    if pm10.empty or transit.empty:
+        return pd.DataFrame()
+
+    dates = pm10.index.intersection(transit.index)
+    gus_both = [g for g in pm10.columns if g in transit.columns]
+    pm10 = pm10.loc[dates, gus_both]
+    transit = transit.loc[dates, gus_both]
+
+    # 두 자료가 모두 있는 (날짜, 자치구)만 사용하여 내부 조인과 같은 기준을 유지합니다.
+    both = pm10.notna() & transit.notna()
+    return (
+        pd.DataFrame(
+            {
+                "Date": dates,
+                "미세먼지(PM10)": pm10.where(both).mean(axis=1).to_numpy(),
+                "승객_수": transit.where(both).sum(axis=1, min_count=1).to_numpy(),
+            }
+        )
+        .dropna()
+        .reset_index(drop=True)
+    )
+
+
+@dataset_node("pm10_similarity", "pm10_imputed", "years")
+def compute_pm10_similarity(pm10_imputed, years):
+    return district_similarity(pm10_imputed, years)
+
+
+@dataset_node("residual_pm10_similarity", "pm10_components", "years")
+def compute_residual_pm10_similarity(pm10_components, years):
+    """공통 계절성과 추세를 뺀 잔차로 자치구 간 유사도를 계산합니다. 결측일은 쌍별로 제외됩니다."""
+    return district_similarity(pm10_components["residual"], years)
+
+
+@dataset_node("map_avg_pm10", "pol", "years", "gus")
+def aggregate_map_avg_pm10(pol, years, gus):
+    """지도는 교차 필터의 원천이므로 지도 선택과 무관하게 선택된 모든 자치구를 표시합니다."""
+    return aggregate_avg_pm10(filter_pol(pol, years, gus))
+
+
+@dataset_node("tab3_gu_spending_pm10", "spent_filt", "pol_filt", "tab3_year")
+def aggregate_tab3_gu_spending_pm10(spent_filt, pol_filt, year):
+    """탭 3 지도용 자치구별 평균 지출액과 평균 PM10 (선택 연도 기준)"""
+    if not spent_filt.empty:
+        spent_avg = (
+            spent_filt[spent_filt["Year"] == year]
+            .groupby("자치구")["지출_총금액"]
+            .mean()
+        )
+    else:
+        spent_avg = pd.Series(dtype=float)
+
+    pm10_avg = (
+        pol_filt[pol_filt["Year"] == year]
+        .groupby("자치구")["미세먼지(PM10)"]
+        .mean()
+    )
+
+    return pd.merge(
+        spent_avg.reset_index(),
+        pm10_avg.reset_index(),
+        on="자치구",
+        how="inner",
+        suffixes=("_spending", "_pm10"),
+    ).rename(columns={"지출_총금액": "Avg_Spending", "미세먼지(PM10)": "PM10"})
+
+
+@dataset_node("gu_indicators", "avg_pm10", "trans_filt", "spent_filt")
+def aggregate_gu_indicators(avg_pm10, trans_filt, spent_filt):
+    """탭 4 상관관계용 자치구별 PM10 평균, 대중교통 이용량 합계, 평균 지출액"""
+    if not trans_filt.empty:
+        transit_avg_gu = trans_filt.groupby("자치구")["승객_수"].sum()
+    else:
+        transit_avg_gu = pd.Series(dtype=float)
+
+    if not spent_filt.empty:
+        spending_avg_gu = spent_filt.groupby("자치구")["지출_총금액"].mean()
+    else:
+        spending_avg_gu = pd.Series(dtype=float)
+
+    return pd.DataFrame(
+        {
+            "PM10": avg_pm10.sort_index(),
+            "대중교통 이용량": transit_avg_gu,
+            "평균 지출액": spending_avg_gu,
+        }
+    ).dropna()
+
+
+@dataset_node("ppl_pm10_comp", "combined_ppl", "avg_pm10")
+def aggregate_ppl_pm10_comp(combined_ppl, avg_pm10):
+    """2012→2014 자치구별 인구 이동 변화량과 선택 기간 평균 PM10"""
+    if combined_ppl.empty or avg_pm10.empty:
+        return pd.DataFrame(columns=["인구_이동_변화량", "평균_PM10"])
+
+    ppl_2012_pivot = combined_ppl[
+        combined_ppl["Year"] == "2012"
+    ].set_index("자치구")["인구_이동_건수"]
+    ppl_2014_pivot = combined_ppl[
+        combined_ppl["Year"] == "2014"
+    ].set_index("자치구")["인구_이동_건수"]
+
+    ppl_change = (ppl_2014_pivot - ppl_2012_pivot).rename("인구_이동_변화량")
+    return pd.concat([ppl_change, avg_pm10.sort_index().rename("평균_PM10")], axis=1).dropna()
+
+# -------------------------------------------------------------
+# 데이터 완전성(결측) 점검 및 보정 함수
+# -------------------------------------------------------------
+IMPUTATION_METHODS = ["보정 안 함", "선형 보간", "계절(요일) 보간", "공간(자치구 간) 보간"]
+
+
+def _join_loss(left, right, keys, left_name, right_name, date_col="Date"):
+    """
+    내부 조인(inner join)에서 한쪽에만 있어 제외되는 키 개수를 셉니다.
+    수집 기간 자체가 다른 것은 결측이 아니므로 두 데이터의 기간이 겹치는 구간만 셉니다.
+    """
+    start = max(left[date_col].min(), right[date_col].min())
+    end = min(left[date_col].max(), right[date_col].max())
+    left = left.loc[left[date_col].between(start, end), keys]
+    right = right.loc[right[date_col].between(start, end), keys]
+
+    merged = pd.merge(
+        left.drop_duplicates(),
+        right.drop_duplicates(),
+        on=keys,
+        how="outer",
+        indicator=True,
+    )
+    counts = merged["_merge"].value_counts()
+    return {
+        "결합": int(counts.get("both", 0)),
+        f"{left_name}에만 있음": int(counts.get("left_only", 0)),
+        f"{right_name}에만 있음": int(counts.get("right_only", 0)),
+    }
+
+
+@st.cache_data
+def detect_gaps(matrix):
+    """날짜 × 자치구 행렬에서 연속된 결측 구간(시작일, 종료일, 일수)을 모든 자치구에 대해 한 번에 찾습니다."""
+    missing = matrix.isna().to_numpy().astype("int8")
+    padded = np.pad(missing, ((1, 1), (0, 0)))
+    edges = np.diff(padded, axis=0)
+
+    # 열(자치구) 우선 순서로 시작/끝을 뽑아 같은 순서로 짝을 맞춥니다.
+    start_gu, start_t = np.nonzero(edges.T == 1)
+    _, end_t = np.nonzero(edges.T == -1)
+
+    dates = matrix.index
+    return pd.DataFrame(
+        {
+            "자치구": matrix.columns[start_gu],
+            "시작일": dates[start_t],
+            "종료일": dates[end_t - 1],
+            "일수": end_t - start_t,
+        }
+    ).sort_values("일수", ascending=False, ignore_index=True)
+
+
+@st.cache_data
+def coverage_by_year(matrix):
+    """자치구 × 연도별로 관측된 일수의 비율(%)을 계산합니다."""
+    observed = matrix.notna().groupby(matrix.index.year).mean() * 100
+    observed.index = observed.index.astype(str)
+    return observed.T
+
+
+@st.cache_data
+def impute_matrix(matrix, method):
+    """
+    날짜 × 자치구 행렬의 결측을 모든 자치구에 대해 한 번에 보정합니다.
+    반환값: (보정된 행렬, 보정된 칸 마스크)
+    """
+    missing = matrix.isna()
+    if method == IMPUTATION_METHODS[0] or not missing.any().any():
+        return matrix, missing & False
+
+    filled = matrix.copy()
+    if method == IMPUTATION_METHODS[2]:
+        # 같은 요일(1주 전/후) 값의 평균으로 채웁니다.
+        before, after = matrix.shift(7), matrix.shift(-7)
+        filled = filled.fillna((before.fillna(after) + after.fillna(before)) / 2)
+    elif method == IMPUTATION_METHODS[3]:
+        # 같은 날 다른 자치구 평균에 자치구별 평소 비율을 곱해 채웁니다.
+        city_mean = matrix.mean(axis=1)
+        ratio = matrix.div(city_mean, axis=0).median()
+        spatial = pd.DataFrame(
+            np.outer(city_mean.to_numpy(), ratio.to_numpy()),
+            index=matrix.index,
+            columns=matrix.columns,
+        )
+        filled = filled.fillna(spatial)
+
+    # 남은 결측(또는 선형 보간 방식)은 시간 기준 선형 보간 후 양 끝을 채웁니다.
+    filled = filled.interpolate(method="time", limit_area="inside").ffill().bfill()
+    return filled, missing & filled.notna()
+
+# -------------------------------------------------------------
+# 시계열 분해(추세·계절·잔차) 함수
+# -------------------------------------------------------------
+SERIES_MODES = ["원시값", "계절성 제거 (잔차)"]
+DECOMPOSITION_TREND_WINDOW = 365
+DECOMPOSITION_YEARLY_HARMONICS = 3
+
+
+def _seasonal_design(dates):
+    """요일 더미(7개)와 연간 푸리에 항으로 이루어진 공통 계절 설계 행렬을 만듭니다."""
+    dates = pd.DatetimeIndex(dates)
+    weekday = np.eye(7)[dates.dayofweek.to_numpy()]
+    angle = 2 * np.pi * dates.dayofyear.to_numpy() / 365.25
+    harmonics = [
+        f(k * angle)
+        for k in range(1, DECOMPOSITION_YEARLY_HARMONICS + 1)
+        for f in (np.sin, np.cos)
+    ]
+    return np.column_stack([weekday] + harmonics)
+
+
+@st.cache_data
+def decompose_seasonal_trend(matrix):
+    """
+    날짜 × 자치구 행렬을 회귀 기반으로 추세·계절·잔차로 분해합니다.
+    추세는 중심 이동평균, 계절은 모든 자치구가 공유하는 설계 행렬에 대한 한 번의 최소제곱으로 구합니다.
+    잔차는 원래 관측된 날에만 값을 가집니다.
+    """
+    matrix = matrix.dropna(axis=1, how="all")
+    if matrix.empty:
+        empty = pd.DataFrame()
+        return {"trend": empty, "seasonal": empty, "residual": empty}
+
+    filled = matrix.interpolate(method="time", limit_area="inside").ffill().bfill()
+    trend = filled.rolling(
+        DECOMPOSITION_TREND_WINDOW,
+        center=True,
+        min_periods=DECOMPOSITION_TREND_WINDOW // 2,
+    ).mean()
+    detrended = (filled - trend).to_numpy()
+
+    X = _seasonal_design(matrix.index)
+    rows = np.isfinite(detrended).all(axis=1)
+    coef, *_ = np.linalg.lstsq(X[rows], detrended[rows], rcond=None)
+
+    seasonal_values = X @ coef
+    # 계절 성분의 평균은 추세로 옮겨 계절 성분이 0을 중심으로 움직이게 합니다.
+    offset = seasonal_values.mean(axis=0)
+    seasonal = pd.DataFrame(seasonal_values - offset, index=matrix.index, columns=matrix.columns)
+    trend = trend + offset
+
+    residual = (filled - trend - seasonal).where(matrix.notna())
+    return {"trend": trend, "seasonal": seasonal, "residual": residual}
+
+# -------------------------------------------------------------
+# 차트 렌더링 함수
+# -------------------------------------------------------------
+CHART_BACKENDS = ["브라우저 (Plotly WebGL)", "서버 (Matplotlib)"]
+
+
+def _to_css_color(color):
+    """[R, G, B] 리스트 또는 색상 이름을 CSS 색상 문자열로 변환합니다."""
+    if isinstance(color, str):
+        return color
+    return f"rgb({color[0]},{color[1]},{color[2]})"
+
+
+def _to_mpl_color(color):
+    """[R, G, B] 리스트 또는 색상 이름을 matplotlib 색상으로 변환합니다."""
+    if isinstance(color, str):
+        return color
+    return (color[0] / 255, color[1] / 255, color[2] / 255)
+
+
+def render_twin_axis_chart(
+    x, y1, y2, label1, label2, color1, color2, title, backend, x_label=None
+):
+    """
+    두 개의 y축을 가지는 시계열 차트를 그립니다.
+    브라우저 렌더링 시 열(column) 배열만 전송하고 확대/이동은 클라이언트에서 처리합니다.
+    """
+    x = np.asarray(x)
+    y1 = np.asarray(y1, dtype="float32")
+    y2 = np.asarray(y2, dtype="float32")
+
+    if backend == CHART_BACKENDS[0]:
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_trace(
+            go.Scattergl(x=x, y=y1, mode="lines", name=label1, line={"color": color1}),
+            secondary_y=False,
+        )
+        fig.add_trace(
+            go.Scattergl(x=x, y=y2, mode="lines", name=label2, line={"color": color2}),
+            secondary_y=True,
+        )
+        fig.update_layout(
+            title=title,
+            hovermode="x unified",
+            legend={"orientation": "h", "y": -0.2},
+            margin={"l": 10, "r": 10, "t": 50, "b": 10},
+        )
+        fig.update_xaxes(title_text=x_label)
+        fig.update_yaxes(title_text=label1, color=color1, secondary_y=False)
+        fig.update_yaxes(title_text=label2, color=color2, secondary_y=True)
+        st.plotly_chart(fig, use_container_width=True)
+        return
+
+    fig, ax1 = plt.subplots(figsize=(10, 5))
+    ax2 = ax1.twinx()
+
+    ax1.plot(x, y1, color=color1, label=label1)
+    if x_label:
+        ax1.set_xlabel(x_label)
+    ax1.set_ylabel(label1, color=color1)
+    ax1.tick_params(axis="y", labelcolor=color1)
+
+    ax2.plot(x, y2, color=color2, label=label2)
+    ax2.set_ylabel(label2, color=color2)
+    ax2.tick_params(axis="y", labelcolor=color2)
+
+    ax1.set_title(title)
+    fig.tight_layout()
+    st.pyplot(fig)
+
+
+def render_band_chart(
+    x, median, upper, outer, x_label, y_label, title, color, backend
+):
+    """중앙값 선과 상위 분위수(P90, P95) 밴드를 그립니다."""
+    x = [str(v) for v in x]
+    median = np.asarray(median, dtype="float64")
+    upper = np.asarray(upper, dtype="float64")
+    outer = np.asarray(outer, dtype="float64")
+
+    if backend == CHART_BACKENDS[0]:
+        fig = go.Figure()
+        fig.add_trace(
+            go.Scatter(x=x, y=median, mode="lines+markers", name="P50", line={"color": color})
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=x, y=upper, mode="lines", name="P90",
+                line={"color": color, "dash": "dash"}, fill="tonexty",
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=x, y=outer, mode="lines", name="P95",
+                line={"color": color, "dash": "dot"}, fill="tonexty",
+            )
+        )
+        fig.update_layout(
+            title=title,
+            xaxis_title=x_label,
+            yaxis_title=y_label,
+            hovermode="x unified",
+            margin={"l": 10, "r": 10, "t": 50, "b": 10},
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        return
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(x, median, color=color, marker="o", label="P50")
+    ax.fill_between(x, median, upper, color=color, alpha=0.3, label="P50~P90")
+    ax.fill_between(x, upper, outer, color=color, alpha=0.15, label="P90~P95")
+    ax.set_xlabel(x_label, fontsize=12)
+    ax.set_ylabel(y_label, fontsize=12)
+    ax.set_title(title, fontsize=14)
+    ax.legend()
+    plt.tight_layout()
+    st.pyplot(fig)
+
+
+def render_bar_chart(x, y, colors, x_label, y_label, title, backend, rotation=0):
+    """막대 차트를 선택된 렌더링 방식(브라우저/서버)으로 그립니다."""
+    x = [str(v) for v in x]
+    y = np.asarray(y, dtype="float64")
+
+    if backend == CHART_BACKENDS[0]:
+        fig = go.Figure(
+            go.Bar(
+                x=x,
+                y=y,
+                marker_color=[_to_css_color(c) for c in colors],
+                hovertemplate="%{x}: %{y:,.1f}<extra></extra>",
+            )
+        )
+        fig.update_layout(
+            title=title,
+            xaxis_title=x_label,
+            yaxis_title=y_label,
+            xaxis_tickangle=-rotation,
+            margin={"l": 10, "r": 10, "t": 50, "b": 10},
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        return
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.bar(x, y, color=[_to_mpl_color(c) for c in colors])
+    ax.set_xlabel(x_label, fontsize=12)
+    ax.set_ylabel(y_label, fontsize=12)
+    ax.set_title(title, fontsize=14)
+    plt.xticks(rotation=rotation, ha="right" if rotation else "center")
+    plt.tight_layout()
+    st.pyplot(fig)
+
 # -------------------------------------------------------------
 # 데이터 로드
 # -------------------------------------------------------------
+DATA_FILES = [
+    "spent.csv",
+    "ppl_2012.csv",
+    "ppl_2014.csv",
+    "delivery.csv",
+    "combined_pol.csv",
+    "trans.csv",
+]
+
+
+def data_files_version():
+    """원본 CSV 파일들의 수정 시각을 묶어 데이터 버전으로 사용합니다."""
+    return tuple(
+        os.path.getmtime(f) if os.path.exists(f) else None for f in DATA_FILES
+    )
+
+
 @st.cache_data
-def load_data():
+def load_data(source_version):
     """
     필요한 모든 데이터를 로드하고 전처리합니다.
     파일 로드 실패 시에도 앱이 중단되지 않고 빈 데이터프레임을 반환합니다.
+    source_version(원본 파일 수정 시각)은 캐시 키로만 쓰여, CSV가 바뀌면 다시 로드됩니다.
     """
-    files_needed = [
-        "spent.csv",
-        "ppl_2012.csv",
-        "ppl_2014.csv",
-        "delivery.csv",
-        "combined_pol.csv",
-        "trans.csv",
-    ]
+    files_needed = DATA_FILES
 
     data_map = {}
+    data_quality = {"dropped_dates": {}, "joins": {}}
+    # 스냅샷 manifest가 실제로 읽은 파일과 일치하도록 읽기 직전에 원본 지문을 기록합니다.
+    data_quality["source_fingerprints"] = fingerprint_sources(files_needed)
 
     for file_name in files_needed:
         var_name = file_name.replace(".csv", "").replace("combined_", "")
@@ -92,6 +1169,7 @@ def load_data():
         pol["일시"] = pol["일시"].astype(str)
         pol["Year"] = pol["일시"].str[:4]
         pol["Date"] = pd.to_datetime(pol["일시"], errors="coerce")
+        data_quality["dropped_dates"]["combined_pol.csv"] = int(pol["Date"].isna().sum())
         pol.dropna(subset=["Date"], inplace=True)
         pol["Status"], pol["Color"] = zip(*pol["미세먼지(PM10)"].apply(get_pm10_status))
 
@@ -118,10 +1196,11 @@ def load_data():
         daily_trans = pd.DataFrame()
     else:
         trans["Date"] = pd.to_datetime(trans["기준_날짜"], errors="coerce")
+        data_quality["dropped_dates"]["trans.csv"] = int(trans["Date"].isna().sum())
         trans.dropna(subset=["Date"], inplace=True)
         trans["Year"] = trans["기준_날짜"].astype(str).str[:4]
         daily_trans = (
-            trans.groupby(["Date", "자치구"])["승객_수"]
+            trans.groupby(["Date", "자치구", "Year"])["승객_수"]
             .sum()
             .reset_index()
         )
@@ -134,6 +1213,7 @@ def load_data():
         delivery.columns = delivery.columns.str.strip().str.replace('"', "")
         delivery = delivery.rename(columns={"전체": "배달_건수_지수"})
         delivery["Date"] = pd.to_datetime(delivery["Date"], errors="coerce")
+        data_quality["dropped_dates"]["delivery.csv"] = int(delivery["Date"].isna().sum())
         delivery.dropna(subset=["Date"], inplace=True)
         delivery["Year"] = delivery["Date"].dt.year.astype(str)
 
@@ -193,6 +1273,14 @@ def load_data():
             on=["Date", "자치구"],
             how="inner",
         )
+        # 서울 전체 "평균" 행은 교통 데이터에 없으므로 결측으로 세지 않습니다.
+        data_quality["joins"]["combined_mobility"] = _join_loss(
+            daily_pol[daily_pol["자치구"] != "평균"],
+            daily_trans,
+            ["Date", "자치구"],
+            "미세먼지",
+            "대중교통",
+        )
     else:
         combined_mobility = pd.DataFrame()
 
@@ -208,27 +1296,47 @@ def load_data():
             on="Date",
             how="inner",
         )
+        data_quality["joins"]["combined_delivery"] = _join_loss(
+            seoul_daily_pol, delivery, ["Date"], "미세먼지", "배달"
+        )
     else:
         combined_delivery = pd.DataFrame()
 
     GUS_df = pd.DataFrame()
 
+    # 7. 날짜 × 자치구 행렬과 (자치구, 연도) 분위수 스케치는 원본이 바뀔 때만 한 번 생성합니다.
+    pm10_matrix = build_daily_matrix(daily_pol)
+    transit_matrix = build_daily_matrix(daily_trans, "승객_수")
+    pm10_sketches = build_quantile_sketches(
+        pol[pol["자치구"] != "평균"] if not pol.empty else pol, "미세먼지(PM10)"
+    )
+    transit_sketches = build_quantile_sketches(daily_trans, "승객_수")
+
     return (
         spent,
         ppl_2012,
         ppl_2014,
         delivery,
         pol,
+        daily_pol,
         trans,
+        daily_trans,
         GUS_df,
         combined_mobility,
         combined_delivery,
         combined_ppl,
+        pm10_matrix,
+        transit_matrix,
+        pm10_sketches,
+        transit_sketches,
+        data_quality,
     )
 
 # -------------------------------------------------------------
 # 데이터 로드
 # -------------------------------------------------------------
+source_version = data_files_version()
+
 try:
     (
         spent,
@@ -236,12 +1344,19 @@ try:
         ppl_2014,
         delivery,
         pol,
+        daily_pol,
         trans,
+        daily_trans,
         GUS_df,
         combined_mobility,
         combined_delivery,
         combined_ppl,
-    ) = load_data()
+        pm10_matrix,
+        transit_matrix,
+        pm10_sketches,
+        transit_sketches,
+        data_quality,
+    ) = load_data(source_version)
 except Exception as e:
     st.error(f"데이터 로드 과정 중 예측하지 못한 오류가 발생했습니다: {e}")
     st.stop()
@@ -325,6 +1440,36 @@ if "전체 자치구" in selected_gus_options:
 else:
     selected_gus = selected_gus_options
 
+chart_backend = st.sidebar.radio(
+    "3. 차트 렌더링 방식",
+    CHART_BACKENDS,
+    index=0,
+    help="브라우저 렌더링은 데이터만 전송하고 확대/이동을 브라우저에서 처리합니다.",
+)
+
+# 두 지도 탭이 함께 쓰는 초기 시점
+initial_view_state = pdk.ViewState(
+    latitude=37.5665,
+    longitude=126.978,
+    zoom=10,
+    pitch=45,
+)
+
+imputation_method = st.sidebar.selectbox(
+    "4. 결측 보정 방식",
+    IMPUTATION_METHODS,
+    help="날짜 × 자치구 PM10·승객 수 행렬의 결측일을 보정하여 일별 차트, 통합 데이터, 예측, 자치구 유사도 분석에 사용합니다.",
+)
+
+series_mode = st.sidebar.radio(
+    "5. 시계열 표시 값",
+    SERIES_MODES,
+    index=0,
+    help="계절성 제거를 선택하면 요일·연간 계절성과 장기 추세를 뺀 잔차로 일별 시계열 차트, 탭 2의 일별 상관계수, "
+    "탭 4의 자치구 간 유사도를 계산합니다. 자치구 평균 기준 상관관계는 바뀌지 않습니다.",
+)
+use_residuals = series_mode == SERIES_MODES[1]
+
 st.sidebar.subheader("PM10 농도 기준 (μg/m³)")
 pm_colors = {
     "좋음": [170, 204, 247],
@@ -341,23 +1486,103 @@ for status, color in pm_colors.items():
         unsafe_allow_html=True,
     )
 
-pol_filt = pol[
-    (pol["Year"].isin(selected_years)) & (pol["자치구"].isin(selected_gus))
-]
-trans_filt = trans[
-    (trans["Year"].isin(selected_years)) & (trans["자치구"].isin(selected_gus))
-]
-spent_filt = spent[
-    (spent["Year"].isin(selected_years)) & (spent["자치구"].isin(selected_gus))
-]
+PM10_MAP_LAYER_ID = "pm10-map"
+pm10_map_key = f"tab1_pm10_map_{st.session_state.get('pm10_map_round', 0)}"
+pm10_map_state = st.session_state.get(pm10_map_key) or {}
+pm10_map_objects = (
+    pm10_map_state.get("selection", {}).get("objects", {}).get(PM10_MAP_LAYER_ID, [])
+)
+focus_gu = pm10_map_objects[0].get("자치구") if pm10_map_objects else None
+
+
+def clear_pm10_map_selection():
+    """위젯 키를 바꿔 지도 선택(교차 필터)을 초기화합니다."""
+    st.session_state["pm10_map_round"] = st.session_state.get("pm10_map_round", 0) + 1
+
+
+if focus_gu in selected_gus:
+    st.sidebar.info(f"지도 선택 자치구: {focus_gu} (다른 화면이 이 자치구로 필터링됩니다)")
+    st.sidebar.button("지도 선택 해제", on_click=clear_pm10_map_selection)
+
+dataset_inputs = {
+    "pol": (pol, ("pol",) + source_version),
+    "trans": (trans, ("trans",) + source_version),
+    "spent": (spent, ("spent",) + source_version),
+    "combined_mobility": (combined_mobility, ("combined_mobility",) + source_version),
+    "combined_ppl": (combined_ppl, ("combined_ppl",) + source_version),
+    "delivery": (delivery, ("delivery",) + source_version),
+    "combined_delivery": (combined_delivery, ("combined_delivery",) + source_version),
+    "pm10_matrix": (pm10_matrix, ("pm10_matrix",) + source_version),
+    "transit_matrix": (transit_matrix, ("transit_matrix",) + source_version),
+    "imputation": (imputation_method, imputation_method),
+    "years": (selected_years, tuple(selected_years)),
+    "gus": (selected_gus, tuple(selected_gus)),
+    "focus_gu": (focus_gu, focus_gu),
+}
+dataset_memo = st.session_state.setdefault("dataset_graph_memo", {})
 
-if not combined_mobility.empty:
-    mobility_filt = combined_mobility[
-        (combined_mobility["Date"].dt.year.astype(str).isin(selected_years))
-        & (combined_mobility["자치구"].isin(selected_gus))
-    ].copy()
-else:
-    mobility_filt = pd.DataFrame()
+
+def get_dataset(name):
+    return resolve_dataset(name, dataset_inputs, dataset_memo)[0]
+
+
+def build_snapshot_tables():
+    """스냅샷으로 내보낼 주요 파생 테이블을 만듭니다."""
+    pol_gu = pol[pol["자치구"] != "평균"]
+    gu_yearly = pol_gu.groupby(["자치구", "Year"]).agg(
+        PM10_평균=("미세먼지(PM10)", "mean"),
+        PM10_최대=("미세먼지(PM10)", "max"),
+        측정일수=("Date", "nunique"),
+    )
+    if not trans.empty:
+        gu_yearly = gu_yearly.join(
+            trans.groupby(["자치구", "Year"])["승객_수"].sum().rename("승객_수_합계"),
+            how="outer",
+        )
+    if not spent.empty:
+        gu_yearly = gu_yearly.join(
+            spent.groupby(["자치구", "Year"])["지출_총금액"].mean().rename("지출_총금액_평균"),
+            how="outer",
+        )
+
+    daily_pol_gu = daily_pol[daily_pol["자치구"] != "평균"]
+    status_buckets = (
+        daily_pol_gu.assign(Year=daily_pol_gu["Date"].dt.year.astype(str))
+        .groupby(["자치구", "Year", "Status"])
+        .agg(일수=("Date", "size"), PM10_평균=("미세먼지(PM10)", "mean"))
+    )
+
+    return {
+        "daily_pol": daily_pol,
+        "combined_mobility": combined_mobility,
+        "combined_delivery": combined_delivery,
+        "combined_ppl": combined_ppl,
+        "gu_yearly": gu_yearly.reset_index(),
+        "status_buckets": status_buckets.reset_index(),
+    }
+
+
+with st.sidebar.expander("데이터 스냅샷 내보내기 (Arrow)"):
+    st.caption(
+        "주요 파생 테이블을 버전별 Arrow IPC(Feather) 파일로 저장합니다. "
+        "다른 노트북에서는 `snapshot.load_snapshot_table()`로 바로 읽을 수 있습니다."
+    )
+    if st.button("스냅샷 내보내기", key="export_snapshot"):
+        try:
+            snapshot_version, snapshot_dir = export_snapshot(
+                build_snapshot_tables(),
+                data_quality["source_fingerprints"],
+            )
+            st.success(f"스냅샷 {snapshot_version} 저장 완료: {snapshot_dir}")
+        except Exception as e:
+            st.error(f"스냅샷 내보내기 중 오류 발생: {e}")
+
+
+view_gus = get_dataset("view_gus")
+pol_filt = get_dataset("pol_filt")
+trans_filt = get_dataset("trans_filt")
+spent_filt = get_dataset("spent_filt")
+mobility_filt = get_dataset("mobility_filt")
 
 # -------------------------------------------------------------
 # 탭 구성
@@ -382,40 +1607,105 @@ with tab1:
         st.warning("선택된 연도 및 자치구에 해당하는 미세먼지 데이터가 없습니다.")
     else:
         st.subheader("일별 미세먼지 농도 추이 (선택 자치구)")
-        daily_pm10_trend = (
-            pol_filt.groupby(["Date", "자치구"])["미세먼지(PM10)"]
-            .mean()
-            .unstack()
-        )
-        st.line_chart(daily_pm10_trend, use_container_width=True)
-        st.caption("선택된 자치구별 일평균 PM10 농도 변화 추이")
+        if use_residuals:
+            daily_pm10_trend = get_dataset("residual_pm10_trend")
+            st.line_chart(daily_pm10_trend, use_container_width=True)
+            st.caption("선택된 자치구별 PM10 잔차 (추세와 요일·연간 계절성을 제거한 값)")
+
+            pm10_components = get_dataset("pm10_components")
+            decomposition_gus = [g for g in view_gus if g in pm10_components["residual"].columns]
+            if decomposition_gus:
+                with st.expander("자치구별 PM10 시계열 분해 (추세 / 계절 / 잔차)"):
+                    decomposition_gu = st.selectbox(
+                        "자치구 선택", decomposition_gus, key="tab1_decomposition_gu"
+                    )
+                    decomposition_df = pd.DataFrame(
+                        {
+                            "원시값": pm10_matrix[decomposition_gu],
+                            "추세": pm10_components["trend"][decomposition_gu],
+                            "계절": pm10_components["seasonal"][decomposition_gu],
+                            "잔차": pm10_components["residual"][decomposition_gu],
+                        }
+                    )
+                    decomposition_df = decomposition_df[
+                        decomposition_df.index.year.astype(str).isin(selected_years)
+                    ]
+                    st.line_chart(decomposition_df, use_container_width=True)
+        else:
+            daily_pm10_trend = get_dataset("daily_pm10_trend")
+            st.line_chart(daily_pm10_trend, use_container_width=True)
+            st.caption("선택된 자치구별 일평균 PM10 농도 변화 추이")
 
         st.subheader("지역별 평균 PM10 농도 비교")
-        avg_pm10 = (
-            pol_filt.groupby("자치구")["미세먼지(PM10)"]
-            .mean()
-            .sort_values(ascending=False)
-        )
+        avg_pm10 = get_dataset("avg_pm10")
 
-        fig, ax = plt.subplots(figsize=(10, 5))
-        colors = [get_pm10_status(v)[1] for v in avg_pm10.values]
-        ax.bar(
+        render_bar_chart(
             avg_pm10.index,
             avg_pm10.values,
-            color=[(c[0] / 255, c[1] / 255, c[2] / 255) for c in colors],
-        )
-        ax.set_xlabel("자치구", fontsize=12)
-        ax.set_ylabel("평균 PM10 (μg/m³)", fontsize=12)
-        ax.set_title(
+            [get_pm10_status(v)[1] for v in avg_pm10.values],
+            "자치구",
+            "평균 PM10 (μg/m³)",
             f"선택 연도({', '.join(selected_years)}) 기준 자치구별 평균 PM10",
-            fontsize=14,
+            chart_backend,
+            rotation=45,
+        )
+
+        st.subheader("PM10 및 대중교통 이용량 분위수 밴드")
+        pm10_band = query_sketch_quantiles(
+            pm10_sketches, view_gus, selected_years, by="Year"
+        )
+        transit_band = query_sketch_quantiles(
+            transit_sketches, view_gus, selected_years, by="Year"
+        )
+
+        band_col1, band_col2 = st.columns(2)
+        with band_col1:
+            if not pm10_band.empty:
+                render_band_chart(
+                    pm10_band.index,
+                    pm10_band["P50"],
+                    pm10_band["P90"],
+                    pm10_band["P95"],
+                    "연도",
+                    "PM10 (μg/m³)",
+                    "연도별 일평균 PM10 분위수 (P50 / P90 / P95)",
+                    "orange",
+                    chart_backend,
+                )
+        with band_col2:
+            if not transit_band.empty:
+                render_band_chart(
+                    transit_band.index,
+                    transit_band["P50"],
+                    transit_band["P90"],
+                    transit_band["P95"],
+                    "연도",
+                    "일별 승객 수",
+                    "연도별 자치구 일별 승객 수 분위수 (P50 / P90 / P95)",
+                    "green",
+                    chart_backend,
+                )
+            else:
+                st.info("대중교통 데이터가 없어 승객 수 분위수를 표시할 수 없습니다.")
+
+        pm10_quantiles_gu = query_sketch_quantiles(
+            pm10_sketches, view_gus, selected_years, by="자치구"
+        )
+        transit_quantiles_gu = query_sketch_quantiles(
+            transit_sketches, view_gus, selected_years, by="자치구"
+        )
+        quantile_table = pd.concat(
+            {"PM10": pm10_quantiles_gu, "승객 수": transit_quantiles_gu}, axis=1
+        )
+        st.dataframe(
+            quantile_table.style.format("{:,.1f}"), use_container_width=True
+        )
+        st.caption(
+            f"(자치구, 연도)별로 미리 만든 분위수 스케치를 병합한 값으로, 상대 오차는 최대 {SKETCH_RELATIVE_ACCURACY:.0%}입니다."
         )
-        plt.xticks(rotation=45, ha="right")
-        plt.tight_layout()
-        st.pyplot(fig)
 
         st.subheader("지역별 PM10 농도 시각화 (지도)")
-        map_df = avg_pm10.reset_index().rename(
+        map_df = get_dataset("map_avg_pm10").reset_index().rename(
             columns={"미세먼지(PM10)": "Avg_PM10"}
         )
         map_df["lat"] = map_df["자치구"].apply(
@@ -430,25 +1720,90 @@ with tab1:
 
         layer = pdk.Layer(
             "ScatterplotLayer",
+            id=PM10_MAP_LAYER_ID,
             data=map_df,
             get_position="[lon, lat]",
             get_radius=2500,
             get_fill_color="pm_color",
             pickable=True,
             opacity=0.8,
-        )
-        initial_view_state = pdk.ViewState(
-            latitude=37.5665,
-            longitude=126.978,
-            zoom=10,
-            pitch=45,
+            auto_highlight=True,
         )
         st.pydeck_chart(
             pdk.Deck(
                 layers=[layer],
                 initial_view_state=initial_view_state,
                 tooltip={"text": "{자치구}\n평균 PM10: {Avg_PM10:.1f} µg/m³"},
+            ),
+            on_select="rerun",
+            selection_mode="single-object",
+            key=pm10_map_key,
+        )
+        st.caption("지도에서 자치구를 클릭하면 다른 차트와 표가 해당 자치구로 필터링됩니다.")
+
+    st.markdown("---")
+    st.subheader("데이터 완전성 (결측 현황)")
+
+    coverage_sources = {"PM10": pm10_matrix, "대중교통 승객 수": transit_matrix}
+    coverage_tabs = st.tabs(list(coverage_sources))
+    for coverage_tab, (source_name, matrix) in zip(coverage_tabs, coverage_sources.items()):
+        with coverage_tab:
+            if matrix.empty:
+                st.info(f"{source_name} 데이터가 없어 결측 현황을 계산할 수 없습니다.")
+                continue
+
+            coverage = coverage_by_year(matrix)
+            coverage = coverage.loc[
+                [g for g in view_gus if g in coverage.index],
+                [y for y in selected_years if y in coverage.columns],
+            ]
+            st.dataframe(
+                coverage.style.format("{:.1f}%").background_gradient(
+                    cmap="RdYlGn", vmin=0, vmax=100
+                ),
+                use_container_width=True,
+            )
+
+            gaps = detect_gaps(matrix)
+            gaps = gaps[
+                gaps["자치구"].isin(view_gus)
+                & (gaps["종료일"].dt.year.astype(str) >= min(selected_years, default="0"))
+                & (gaps["시작일"].dt.year.astype(str) <= max(selected_years, default="9999"))
+            ]
+            st.caption(
+                f"선택 조건의 연속 결측 구간 {len(gaps)}개 (총 {int(gaps['일수'].sum())}일). 긴 구간 순 상위 10개:"
             )
+            st.dataframe(gaps.head(10), use_container_width=True, hide_index=True)
+
+    quality_col1, quality_col2 = st.columns(2)
+    with quality_col1:
+        st.markdown("**날짜 파싱 실패로 제외된 행**")
+        st.dataframe(
+            pd.Series(data_quality["dropped_dates"], name="제외된 행 수", dtype="int64"),
+            use_container_width=True,
+        )
+    with quality_col2:
+        st.markdown("**내부 조인으로 제외된 키(날짜·자치구, 공통 기간 내)**")
+        if data_quality["joins"]:
+            st.dataframe(
+                pd.DataFrame(data_quality["joins"]).T.fillna(0).astype("int64"),
+                use_container_width=True,
+            )
+            if "combined_delivery" in data_quality["joins"]:
+                st.caption(
+                    "배달 데이터는 주 단위로 집계되어 있어, 공통 기간 내라도 배달 집계일이 아닌 날의 PM10은 결합되지 않습니다."
+                )
+        else:
+            st.info("결합된 데이터가 없습니다.")
+
+    if imputation_method != IMPUTATION_METHODS[0]:
+        pm10_imputed_mask = get_dataset("pm10_imputation")[1]
+        transit_imputed_mask = get_dataset("transit_imputation")[1]
+        st.caption(
+            f"'{imputation_method}' 방식으로 PM10 결측 {int(pm10_imputed_mask.to_numpy().sum()):,}칸, "
+            f"승객 수 결측 {int(transit_imputed_mask.to_numpy().sum()):,}칸을 보정하여 "
+            "일별 차트, PM10-교통/배달 통합 데이터, 예측과 자치구 유사도 분석에 사용합니다. "
+            "기간 평균(막대 차트, 지도)과 탭 4의 상관관계는 실측값 기준입니다."
         )
 
 # -------------------------------------------------------------
@@ -463,50 +1818,6 @@ with tab2:
     # col1, col2 레이아웃 정의
     col1, col2 = st.columns(2)
 
-    try:
-        pol_df = pd.read_csv("combined_pol.csv")
-        trans_df = pd.read_csv("trans.csv")
-    except FileNotFoundError:
-        st.warning("필요한 파일(combined_pol.csv 또는 trans.csv)을 찾을 수 없습니다.")
-        pol_df = pd.DataFrame()
-        trans_df = pd.DataFrame()
-
-    if not pol_df.empty and not trans_df.empty:
-        pol_df = pol_df.rename(
-            columns={"일시": "날짜", "미세먼지(PM10)": "PM10_농도"}
-        )
-        pol_df["날짜"] = pd.to_datetime(pol_df["날짜"], errors="coerce")
-
-        seoul_daily_pm10 = pol_df[pol_df["자치구"] == "평균"][
-            ["날짜", "PM10_농도"]
-        ].copy()
-
-        trans_df = trans_df.rename(
-            columns={"기준_날짜": "날짜", "승객_수": "총_승객_수"}
-        )
-        trans_df["날짜"] = pd.to_datetime(trans_df["날짜"], errors="coerce")
-
-        daily_trans_sum = (
-            trans_df.groupby("날짜")["총_승객_수"]
-            .sum()
-            .reset_index()
-        )
-
-        merged_df = pd.merge(
-            daily_trans_sum,
-            seoul_daily_pm10,
-            on="날짜",
-            how="inner",
-        ).dropna()
-
-        if not merged_df.empty:
-            correlation = merged_df["PM10_농도"].corr(merged_df["총_승객_수"])
-        else:
-            correlation = np.nan
-    else:
-        merged_df = pd.DataFrame()
-        correlation = np.nan
-
     if mobility_filt.empty:
         st.warning(
             "선택된 조건에 해당하는 미세먼지-교통 통합 데이터가 부족하거나, trans.csv 파일 로드에 문제가 있었습니다."
@@ -514,38 +1825,30 @@ with tab2:
     else:
         with col1:
             st.subheader("PM10과 대중교통 이용량 시계열 비교")
-            daily_comp_mobility = (
-                mobility_filt.groupby("Date")
-                .agg({"미세먼지(PM10)": "mean", "승객_수": "sum"})
-                .reset_index()
-            )
+            if use_residuals:
+                daily_comp_mobility = get_dataset("residual_daily_mobility")
+                pm10_label, transit_label = "PM10 잔차 (μg/m³)", "총 승객 수 잔차"
+            else:
+                daily_comp_mobility = get_dataset("daily_comp_mobility")
+                pm10_label, transit_label = "PM10 (μg/m³)", "총 승객 수"
 
             if not daily_comp_mobility.empty:
-                fig, ax1 = plt.subplots(figsize=(10, 5))
-                ax2 = ax1.twinx()
-
-                ax1.plot(
+                render_twin_axis_chart(
                     daily_comp_mobility["Date"],
                     daily_comp_mobility["미세먼지(PM10)"],
-                    color="blue",
-                    label="PM10 농도",
-                )
-                ax1.set_xlabel("날짜")
-                ax1.set_ylabel("PM10 (μg/m³)", color="blue")
-                ax1.tick_params(axis="y", labelcolor="blue")
-
-                ax2.plot(
-                    daily_comp_mobility["Date"],
                     daily_comp_mobility["승객_수"],
-                    color="green",
-                    label="총 승객 수",
+                    pm10_label,
+                    transit_label,
+                    "blue",
+                    "green",
+                    "PM10 농도와 대중교통 이용량 일별 변화 추이",
+                    chart_backend,
+                    x_label="날짜",
+                )
+                st.metric(
+                    f"일별 상관계수 ({series_mode})",
+                    f"{daily_comp_mobility['미세먼지(PM10)'].corr(daily_comp_mobility['승객_수']):.3f}",
                 )
-                ax2.set_ylabel("총 승객 수", color="green")
-                ax2.tick_params(axis="y", labelcolor="green")
-
-                ax1.set_title("PM10 농도와 대중교통 이용량 일별 변화 추이")
-                fig.tight_layout()
-                st.pyplot(fig)
             else:
                 st.warning("선택된 조건에 해당하는 데이터가 부족합니다.")
 
@@ -574,31 +1877,74 @@ with tab2:
                     "Status"
                 ).dropna(subset=["Status"])
 
-                fig, ax = plt.subplots(figsize=(10, 5))
-                bar_colors = []
-                for status in avg_transit_by_pm10["Status"]:
-                    simple_status = status.split("(")[0]
-                    color = pm_colors.get(simple_status, [128, 128, 128])
-                    bar_colors.append(
-                        (color[0] / 255, color[1] / 255, color[2] / 255)
-                    )
-
-                ax.bar(
+                bar_colors = [
+                    pm_colors.get(status.split("(")[0], [128, 128, 128])
+                    for status in avg_transit_by_pm10["Status"]
+                ]
+                render_bar_chart(
                     avg_transit_by_pm10["Status"],
                     avg_transit_by_pm10["승객_수"],
-                    color=bar_colors,
+                    bar_colors,
+                    "PM10 농도 상태",
+                    "평균 승객 수",
+                    "PM10 상태별 대중교통 일평균 이용 건수",
+                    chart_backend,
                 )
-                ax.set_xlabel("PM10 농도 상태", fontsize=12)
-                ax.set_ylabel("평균 승객 수", fontsize=12)
-                ax.set_title("PM10 상태별 대중교통 일평균 이용 건수")
-                plt.xticks(rotation=0)
-                plt.tight_layout()
-                st.pyplot(fig)
             else:
                 st.warning(
                     "PM10 상태별 평균 대중교통 이용량 데이터를 생성할 수 없습니다."
                 )
 
+        st.subheader("PM10 기준값 민감도 분석")
+        if st.checkbox(
+            "기준값 스윕(sweep) 모드",
+            key="tab2_threshold_sweep",
+            help="고정 기준(30/80/150) 대신 다양한 기준값에서 평균 대중교통 이용량이 어떻게 달라지는지 확인합니다.",
+        ):
+            sweep_range = st.slider(
+                "기준값 범위 (μg/m³)",
+                min_value=0,
+                max_value=300,
+                value=(10, 200),
+                key="tab2_sweep_range",
+            )
+            sweep_df = sweep_pm10_thresholds(
+                mobility_filt["미세먼지(PM10)"].to_numpy(),
+                mobility_filt["승객_수"].to_numpy(),
+                np.arange(sweep_range[0], sweep_range[1] + 1),
+            )
+
+            st.line_chart(
+                sweep_df[["이하_평균", "초과_평균"]].rename(
+                    columns={
+                        "이하_평균": "기준값 이하 평균 승객 수",
+                        "초과_평균": "기준값 초과 평균 승객 수",
+                    }
+                ),
+                use_container_width=True,
+            )
+            st.caption(
+                "x축의 각 기준값에 대해 PM10이 기준값 이하/초과인 날의 자치구별 일평균 승객 수를 비교합니다."
+            )
+
+            preset_tables = []
+            for preset_name, cutoffs in PM10_THRESHOLD_PRESETS.items():
+                preset_df = pm10_bucket_stats(
+                    mobility_filt["미세먼지(PM10)"].to_numpy(),
+                    mobility_filt["승객_수"].to_numpy(),
+                    cutoffs,
+                )
+                preset_df.insert(0, "기준", preset_name)
+                preset_tables.append(preset_df)
+
+            st.dataframe(
+                pd.concat(preset_tables, ignore_index=True).style.format(
+                    {"평균": "{:,.0f}"}
+                ),
+                use_container_width=True,
+                hide_index=True,
+            )
+
     st.markdown("---")
     st.subheader("PR 관점의 인사이트 (이동 패턴 활용)")
     st.markdown(
@@ -624,37 +1970,23 @@ with tab3:
     st.subheader(
         f"연도별 PM10 농도와 배달 건수 지수 변화 ({year_select_tab3}년)"
     )
-    delivery_comp_filt = combined_delivery[
-        combined_delivery["Year"] == year_select_tab3
+    delivery_source = get_dataset("delivery_source")
+    delivery_comp_filt = delivery_source[
+        delivery_source["Year"] == year_select_tab3
     ].set_index("Date")
 
     if not delivery_comp_filt.empty:
-        fig, ax1 = plt.subplots(figsize=(10, 5))
-        ax2 = ax1.twinx()
-
-        ax1.plot(
+        render_twin_axis_chart(
             delivery_comp_filt.index,
             delivery_comp_filt["미세먼지(PM10)"],
-            color="orange",
-            label="PM10 농도",
-        )
-        ax1.set_ylabel("PM10 (μg/m³)", color="orange")
-        ax1.tick_params(axis="y", labelcolor="orange")
-
-        ax2.plot(
-            delivery_comp_filt.index,
             delivery_comp_filt["배달_건수_지수"],
-            color="red",
-            label="배달 건수 지수",
-        )
-        ax2.set_ylabel("배달 건수 지수", color="red")
-        ax2.tick_params(axis="y", labelcolor="red")
-
-        ax1.set_title(
-            f"{year_select_tab3}년 PM10 농도와 배달 건수 지수 변화 추이"
+            "PM10 (μg/m³)",
+            "배달 건수 지수",
+            "orange",
+            "red",
+            f"{year_select_tab3}년 PM10 농도와 배달 건수 지수 변화 추이",
+            chart_backend,
         )
-        fig.tight_layout()
-        st.pyplot(fig)
         st.caption(
             "PM10 농도가 높을수록(혹은 높았던 이후) 배달 건수 지수가 증가하는 경향성이 나타날 수 있습니다."
         )
@@ -665,31 +1997,9 @@ with tab3:
 
     st.subheader("지역별 배달 지표와 PM10 농도 시각화")
 
-    if not spent_filt.empty:
-        spent_avg_tab3 = (
-            spent_filt[spent_filt["Year"] == year_select_tab3]
-            .groupby("자치구")["지출_총금액"]
-            .mean()
-        )
-    else:
-        spent_avg_tab3 = pd.Series(dtype=float)
-
-    pm10_avg_tab3 = (
-        pol_filt[pol_filt["Year"] == year_select_tab3]
-        .groupby("자치구")["미세먼지(PM10)"]
-        .mean()
-    )
-
-    map_data_tab3 = pd.merge(
-        spent_avg_tab3.reset_index(),
-        pm10_avg_tab3.reset_index(),
-        on="자치구",
-        how="inner",
-        suffixes=("_spending", "_pm10"),
-    )
-    map_data_tab3 = map_data_tab3.rename(
-        columns={"지출_총금액": "Avg_Spending", "미세먼지(PM10)": "PM10"}
-    )
+    dataset_inputs["tab3_year"] = (year_select_tab3, year_select_tab3)
+    # 그래프 memo에 보관된 결과이므로 표시용 열은 복사본에 추가합니다.
+    map_data_tab3 = get_dataset("tab3_gu_spending_pm10").copy()
     map_data_tab3["lat"] = map_data_tab3["자치구"].apply(
         lambda g: seoul_gu_latlon.get(g, (0, 0))[0]
     )
@@ -737,6 +2047,44 @@ with tab3:
             f"선택된 연도({year_select_tab3}년)에 해당하는 지역별 지출/PM10 데이터가 부족합니다."
         )
 
+    st.subheader(f"자치구별 PM10 {FORECAST_HORIZON}일 예측 (고농도 예측)")
+
+    if not pm10_matrix.empty and view_gus:
+        forecast_model = get_pm10_forecast_model(
+            get_dataset("pm10_imputed"), model_key=imputation_method
+        )
+        pm10_forecast = forecast_pm10(forecast_model)
+
+        forecast_gus = [g for g in view_gus if g in pm10_forecast.columns]
+        # 실측 이력은 보정 전 원시값으로 그립니다 (결측일은 빈칸으로 표시).
+        history_tail = pm10_matrix[forecast_gus].iloc[-60:]
+        forecast_chart = pd.concat(
+            [
+                history_tail.add_suffix(" (실측)"),
+                pm10_forecast[forecast_gus].add_suffix(" (예측)"),
+            ],
+            axis=1,
+        )
+        st.line_chart(forecast_chart, use_container_width=True)
+
+        forecast_table = pm10_forecast[forecast_gus].T
+        forecast_table.columns = forecast_table.columns.strftime("%m-%d")
+        st.dataframe(
+            forecast_table.style.format("{:.0f}").map(
+                lambda v: "background-color: rgb({},{},{})".format(
+                    *get_pm10_status(v)[1]
+                )
+            ),
+            use_container_width=True,
+        )
+        st.caption(
+            f"전체 자치구에 대해 계절 AR({FORECAST_AR_LAGS}) 모델을 한 번에 적합하여 "
+            f"{forecast_model['last_date']:%Y-%m-%d} 이후 {FORECAST_HORIZON}일을 예측합니다. "
+            "색상은 예측 PM10 상태를 나타냅니다."
+        )
+    else:
+        st.warning("PM10 예측에 필요한 데이터가 부족합니다.")
+
     st.markdown("---")
     st.subheader("마케팅 관점의 인사이트 (소비 패턴 활용)")
     st.markdown(
@@ -760,40 +2108,32 @@ with tab4:
 
     st.subheader("주요 지표 간의 상관관계 (자치구별 평균 기준)")
 
-    if not pol_filt.empty:
-        pm10_avg_gu = pol_filt.groupby("자치구")["미세먼지(PM10)"].mean()
-    else:
-        pm10_avg_gu = pd.Series(dtype=float)
-
-    if not trans_filt.empty:
-        transit_avg_gu = trans_filt.groupby("자치구")["승객_수"].sum()
-    else:
-        transit_avg_gu = pd.Series(dtype=float)
-
-    if not spent_filt.empty:
-        spending_avg_gu = spent_filt.groupby("자치구")["지출_총금액"].mean()
-    else:
-        spending_avg_gu = pd.Series(dtype=float)
-
-    corr_df_gu = pd.DataFrame(
-        {
-            "PM10": pm10_avg_gu,
-            "대중교통 이용량": transit_avg_gu,
-            "평균 지출액": spending_avg_gu,
-        }
-    ).dropna()
+    corr_df_gu = get_dataset("gu_indicators")
 
     if not corr_df_gu.empty and len(corr_df_gu) >= 2:
         corr_mat = corr_df_gu.corr(method="pearson")
+        show_corr_ci = len(corr_df_gu) >= BOOTSTRAP_MIN_SAMPLES
+        if show_corr_ci:
+            corr_conf = correlation_confidence(corr_df_gu)
+            corr_annot = (
+                corr_mat.map("{:.2f}".format)
+                + "\n["
+                + corr_conf["lower"].map("{:.2f}".format)
+                + ", "
+                + corr_conf["upper"].map("{:.2f}".format)
+                + "]"
+            )
+        else:
+            corr_annot = corr_mat.map("{:.2f}".format)
 
         fig, ax = plt.subplots(figsize=(7, 7))
         sns.heatmap(
             corr_mat,
-            annot=True,
+            annot=corr_annot.to_numpy(),
             cmap="vlag",
             ax=ax,
             center=0,
-            fmt=".2f",
+            fmt="",
             linewidths=0.5,
             cbar_kws={"label": "Pearson Correlation Coefficient"},
         )
@@ -804,6 +2144,22 @@ with tab4:
         ax.set_yticklabels(corr_mat.columns, rotation=0)
         plt.tight_layout()
         st.pyplot(fig)
+
+        if show_corr_ci:
+            st.dataframe(
+                correlation_summary(corr_conf).style.format(precision=3),
+                use_container_width=True,
+                hide_index=True,
+            )
+            st.caption(
+                f"괄호 안은 부트스트랩 {BOOTSTRAP_CI:.0%} 신뢰구간이며, p-value는 순열검정 결과입니다 "
+                f"(재표본 {BOOTSTRAP_RESAMPLES:,}회, 자치구 {len(corr_df_gu)}개 기준)."
+            )
+        else:
+            st.caption(
+                f"자치구가 {len(corr_df_gu)}개뿐이라 신뢰구간과 p-value를 표시하지 않습니다 "
+                f"(최소 {BOOTSTRAP_MIN_SAMPLES}개 필요). 상관계수는 참고용으로만 해석해 주세요."
+            )
     elif not corr_df_gu.empty and len(corr_df_gu) < 2:
         st.warning(
             "상관관계를 분석하기에 선택된 자치구 수가 충분하지 않습니다 (최소 2개 이상 필요)."
@@ -812,29 +2168,60 @@ with tab4:
         st.warning("선택된 조건에 해당하는 상관관계 데이터가 부족합니다.")
 
     st.markdown("---")
-    st.subheader("인구 이동 변화와 PM10 농도 연계 분석 (장기 입지 전략)")
-
-    if not combined_ppl.empty and not pol_filt.empty:
-        ppl_2012_pivot = combined_ppl[
-            combined_ppl["Year"] == "2012"
-        ].set_index("자치구")["인구_이동_건수"]
-        ppl_2014_pivot = combined_ppl[
-            combined_ppl["Year"] == "2014"
-        ].set_index("자치구")["인구_이동_건수"]
+    st.subheader("자치구 간 PM10 유사도 (대리 자치구 선정)")
 
-        ppl_change = (ppl_2014_pivot - ppl_2012_pivot).rename(
-            "인구_이동_변화량"
+    if not pm10_matrix.empty and selected_years:
+        similarity = get_dataset(
+            "residual_pm10_similarity" if use_residuals else "pm10_similarity"
         )
+        clustered_corr = similarity["corr"].loc[similarity["order"], similarity["order"]]
+
+        sim_col1, sim_col2 = st.columns([2, 1])
+        with sim_col1:
+            fig, ax = plt.subplots(figsize=(10, 9))
+            sns.heatmap(
+                clustered_corr,
+                cmap="rocket_r",
+                ax=ax,
+                square=True,
+                linewidths=0.3,
+                cbar_kws={"label": "Pearson Correlation Coefficient"},
+            )
+            ax.set_title(
+                f"자치구별 일별 PM10 상관관계 ({series_mode}, 군집 순서, {', '.join(selected_years)})",
+                fontsize=14,
+            )
+            ax.set_xlabel("")
+            ax.set_ylabel("")
+            plt.tight_layout()
+            st.pyplot(fig)
 
-        pm10_long_term_avg = (
-            pol_filt.groupby("자치구")["미세먼지(PM10)"]
-            .mean()
-            .rename("평균_PM10")
-        )
+        with sim_col2:
+            target_gu = st.selectbox(
+                "기준 자치구",
+                similarity["order"],
+                key="tab4_similarity_gu",
+            )
+            st.dataframe(
+                most_similar_districts(similarity, target_gu).style.format(
+                    precision=3
+                ),
+                use_container_width=True,
+                hide_index=True,
+            )
+            st.caption(
+                f"선택 연도의 일별 PM10 상관계수가 높은 순으로 {SIMILAR_GU_COUNT}개 자치구를 보여줍니다. "
+                "RMS 차이는 같은 날의 PM10 농도 차이의 제곱평균제곱근입니다."
+                + (" 계절성 제거 모드에서는 잔차끼리 비교합니다." if use_residuals else "")
+            )
+    else:
+        st.warning("자치구 간 유사도를 계산할 미세먼지 데이터가 부족합니다.")
+
+    st.markdown("---")
+    st.subheader("인구 이동 변화와 PM10 농도 연계 분석 (장기 입지 전략)")
 
-        ppl_pm10_comp = pd.concat(
-            [ppl_change, pm10_long_term_avg], axis=1
-        ).dropna()
+    if not combined_ppl.empty and not pol_filt.empty:
+        ppl_pm10_comp = get_dataset("ppl_pm10_comp")
 
         if not ppl_pm10_comp.empty and len(ppl_pm10_comp) >= 2:
             fig, ax = plt.subplots(figsize=(10, 6))
@@ -882,6 +2269,22 @@ with tab4:
             plt.tight_layout()
             st.pyplot(fig)
 
+            if len(ppl_pm10_comp) >= BOOTSTRAP_MIN_SAMPLES:
+                ppl_conf = correlation_confidence(
+                    ppl_pm10_comp[["평균_PM10", "인구_이동_변화량"]]
+                )
+                st.caption(
+                    "PM10-인구 이동 변화량 상관계수: "
+                    f"{ppl_conf['corr'].iat[0, 1]:.2f} "
+                    f"({BOOTSTRAP_CI:.0%} CI [{ppl_conf['lower'].iat[0, 1]:.2f}, {ppl_conf['upper'].iat[0, 1]:.2f}], "
+                    f"순열검정 p = {ppl_conf['p_value'].iat[0, 1]:.3f})"
+                )
+            else:
+                st.caption(
+                    f"자치구가 {len(ppl_pm10_comp)}개뿐이라 상관계수의 신뢰구간과 p-value를 표시하지 않습니다 "
+                    f"(최소 {BOOTSTRAP_MIN_SAMPLES}개 필요)."
+                )
+
             st.markdown(
                 """
                 - **핵심 관계:** 평균 PM10 농도가 높을수록 유동인구 증가 폭이 낮아지거나 감소하는 경향을 확인할 수 있습니다.